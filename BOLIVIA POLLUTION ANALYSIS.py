@@ -20,23 +20,41 @@ print("="*80)
 
 import subprocess
 import sys
+import importlib.util
+
+# Nombre pip → nombre de import (difieren en earthengine-api)
+PKGS = {
+    'earthengine-api': 'ee',
+    'geemap': 'geemap',
+    'folium': 'folium',
+    'pandas': 'pandas',
+    'numpy': 'numpy',
+    'matplotlib': 'matplotlib',
+    'seaborn': 'seaborn',
+    'geopandas': 'geopandas',
+}
 
-subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", 
-                      "earthengine-api", "geemap", "folium", "pandas", 
-                      "numpy", "matplotlib", "seaborn", "geopandas"])
+# Instalar solo lo que falta: en re-ejecuciones (Colab ya trae casi todo)
+# esto evita los ~30 s de resolución de pip
+missing = [pip_name for pip_name, mod_name in PKGS.items()
+           if importlib.util.find_spec(mod_name) is None]
 
-print("✓ Dependencias instaladas\n")
+if missing:
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "-q"] + missing)
+    print(f"✓ Dependencias instaladas: {', '.join(missing)}\n")
+else:
+    print("✓ Dependencias ya presentes\n")
 
 # PASO 2: IMPORTAR LIBRERÍAS
 print("="*80)
 print("PASO 2: Importando librerías...")
 print("="*80)
 
+# Solo lo necesario para la fase de análisis: las librerías de
+# visualización (geemap, matplotlib, seaborn) se importan justo antes de
+# usarse, para que un fallo de autenticación no pague su costo de carga
 import ee
-import geemap
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 print("✓ Librerías importadas\n")
 
@@ -46,14 +64,24 @@ print("PASO 3: Autenticando Google Earth Engine...")
 print("="*80)
 print("IMPORTANTE: Sigue el enlace que aparece abajo y autoriza el acceso\n")
 
+GEE_PROJECT = 'cambiar el usuario'
+# Endpoint de alto volumen: recomendado para peticiones concurrentes
+GEE_OPT_URL = 'https://earthengine-highvolume.googleapis.com'
+
+# Intentar primero con las credenciales guardadas en disco; el flujo
+# interactivo de ee.Authenticate() solo se abre si no hay token válido
 try:
-    ee.Authenticate()
-    ee.Initialize(project='cambiar el usuario')
+    ee.Initialize(project=GEE_PROJECT, opt_url=GEE_OPT_URL)
     print("\n✓ Google Earth Engine inicializado correctamente\n")
-except Exception as e:
-    print(f"\nError: {e}")
-    print("Por favor, completa la autenticación y ejecuta de nuevo\n")
-    raise
+except Exception:
+    try:
+        ee.Authenticate()
+        ee.Initialize(project=GEE_PROJECT, opt_url=GEE_OPT_URL)
+        print("\n✓ Google Earth Engine inicializado correctamente\n")
+    except Exception as e:
+        print(f"\nError: {e}")
+        print("Por favor, completa la autenticación y ejecuta de nuevo\n")
+        raise
 
 # PASO 4: CONFIGURACIÓN
 print("="*80)
@@ -95,6 +123,14 @@ def get_city_geometry(city_name, buffer_km=50):
 
 bolivia = get_bolivia_geometry()
 
+# Colección Sentinel-2 filtrada una sola vez y compartida por todos los
+# pasos de análisis que la necesiten (turbidez hoy; NDVI/NDWI si se amplía)
+s2_filtered = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
+    .filterDate('2023-01-01', '2023-06-30') \
+    .filterBounds(bolivia) \
+    .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 10)) \
+    .limit(10)  # Limitar a 10 imágenes
+
 # PASO 6: ANÁLISIS DE AIRE
 print("="*80)
 print("PASO 5: Analizando contaminación del aire...")
@@ -122,34 +158,37 @@ except Exception as e:
     
     pm25 = modis_aod.multiply(25).add(10).rename('PM25').clip(bolivia)
 
-city_stats = []
-for city_name in ['La Paz', 'Santa Cruz', 'Cochabamba']:
-    city_geom = get_city_geometry(city_name, buffer_km=30)
-    stats = pm25.reduceRegion(reducer=ee.Reducer.mean(), geometry=city_geom, 
-                              scale=1000, maxPixels=1e9).getInfo()
-    city_stats.append({
-        'city': city_name,
-        'pm25_mean': stats.get('PM25', 0),
-        'population': CITIES[city_name]['population']
-    })
+# Todas las ciudades en una sola petición: reduceRegions sobre una
+# FeatureCollection de buffers urbanos, en vez de un reduceRegion por ciudad
+city_names = ['La Paz', 'Santa Cruz', 'Cochabamba']
+city_fc = ee.FeatureCollection([
+    ee.Feature(get_city_geometry(c, buffer_km=30), {'city': c})
+    for c in city_names
+])
+
+stats_fc = pm25.reduceRegions(collection=city_fc, reducer=ee.Reducer.mean(),
+                              scale=1000, tileScale=4).getInfo()
+
+city_stats = [{
+    'city': f['properties']['city'],
+    'pm25_mean': f['properties'].get('mean', 0) or 0,
+    'population': CITIES[f['properties']['city']]['population']
+} for f in stats_fc['features']]
 
 polluted = pm25.gte(35)
-area_image = polluted.multiply(ee.Image.pixelArea()).divide(1e6)
-affected_area = area_image.reduceRegion(
-    reducer=ee.Reducer.sum(), 
-    geometry=bolivia, 
+# selfMask limita el cálculo a los píxeles contaminados y el reductor
+# unweighted evita la pasada extra de integración de pesos
+area_image = polluted.selfMask().multiply(ee.Image.pixelArea()).divide(1e6)
+# Reducción diferida (ee.Number): se resuelve junto con las de agua y
+# bosque en una sola petición al servidor más abajo
+air_area = area_image.reduceRegion(
+    reducer=ee.Reducer.sum().unweighted(),
+    geometry=bolivia,
     scale=5000,  # Aumentar escala para velocidad
     maxPixels=1e9,
-    bestEffort=True  # Usar mejor esfuerzo
-).getInfo()
-
-air_data = {
-    'pm25_image': pm25,
-    'affected_area_km2': affected_area.get('PM25', 0),
-    'city_statistics': city_stats
-}
+    tileScale=8  # Teselas más pequeñas: más paralelismo, menos memoria
+).get('PM25')
 
-print(f"✓ Área afectada (PM2.5 > 35): {air_data['affected_area_km2']:.2f} km²")
 for city in city_stats:
     print(f"  {city['city']}: PM2.5 = {city['pm25_mean']:.2f} μg/m³")
 print()
@@ -167,18 +206,11 @@ permanent_water = water_occurrence.gte(75)
 # Simplificar análisis de turbidez para evitar timeout
 # Usar menos imágenes y mayor escala
 try:
-    # Reducir período para análisis más rápido
-    s2 = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
-        .filterDate('2023-01-01', '2023-06-30') \
-        .filterBounds(bolivia) \
-        .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 10)) \
-        .limit(10)  # Limitar a 10 imágenes
-    
-    def calculate_ndti(image):
-        red, green = image.select('B4'), image.select('B3')
-        return image.addBands(red.subtract(green).divide(red.add(green)).rename('NDTI'))
-    
-    turbidity = s2.map(calculate_ndti).select('NDTI').mean().clip(bolivia)
+    # NDTI = (B4-B3)/(B4+B3): usar el operador fusionado del servidor en
+    # lugar de construir el grafo subtract/add/divide imagen por imagen
+    turbidity = s2_filtered.map(
+        lambda img: img.addBands(img.normalizedDifference(['B4', 'B3']).rename('NDTI'))
+    ).select('NDTI').mean().clip(bolivia)
     polluted_water = permanent_water.And(turbidity.gte(0.3))
     
 except Exception as e:
@@ -187,22 +219,15 @@ except Exception as e:
     polluted_water = permanent_water
 
 # Calcular área afectada con escala mayor (más rápido)
-area_image = polluted_water.multiply(ee.Image.pixelArea()).divide(1e6)
-water_affected_area = area_image.reduceRegion(
-    reducer=ee.Reducer.sum(), 
-    geometry=bolivia, 
+# También diferida: se resuelve en la petición combinada más abajo
+area_image = polluted_water.selfMask().multiply(ee.Image.pixelArea()).divide(1e6)
+water_area = area_image.reduceRegion(
+    reducer=ee.Reducer.sum().unweighted(),
+    geometry=bolivia,
     scale=500,  # Aumentar escala para velocidad
     maxPixels=1e9,
-    bestEffort=True  # Usar mejor esfuerzo
-).getInfo()
-
-water_data = {
-    'water_occurrence': water_occurrence,
-    'polluted_water': polluted_water,
-    'affected_area_km2': water_affected_area.get('occurrence', 0)
-}
-
-print(f"✓ Área de agua contaminada: {water_data['affected_area_km2']:.2f} km²\n")
+    tileScale=8  # Teselas más pequeñas: más paralelismo, menos memoria
+).get('occurrence')
 
 # PASO 8: ANÁLISIS DE DEFORESTACIÓN
 print("="*80)
@@ -213,17 +238,41 @@ hansen = ee.Image('UMD/hansen/global_forest_change_2023_v1_11')
 loss_year = hansen.select('lossyear').clip(bolivia)
 forest_loss = loss_year.gte(15).And(loss_year.lte(23))
 
-# Optimizar cálculo de área con escala mayor y bestEffort
-area_image = forest_loss.multiply(ee.Image.pixelArea()).divide(10000)
-deforested_area = area_image.reduceRegion(
-    reducer=ee.Reducer.sum(), 
-    geometry=bolivia, 
+# Optimizar cálculo de área: suma sin ponderar a escala fija de 500 m
+# (resultado reproducible, sin bestEffort) y tileScale alto
+area_image = forest_loss.selfMask().multiply(ee.Image.pixelArea()).divide(10000)
+forest_area = area_image.reduceRegion(
+    reducer=ee.Reducer.sum().unweighted(),
+    geometry=bolivia,
     scale=500,  # Aumentar escala significativamente
     maxPixels=1e9,  # Aumentar límite
-    bestEffort=True  # Usar mejor esfuerzo para evitar errores
-).getInfo()
+    tileScale=8  # Teselas más pequeñas: más paralelismo, menos memoria
+).get('lossyear')
+
+# Una sola petición resuelve las tres reducciones de área: GEE las
+# planifica juntas y puede compartir teselas intermedias en el servidor
+reductions = ee.Dictionary({
+    'air_km2': air_area,
+    'water_km2': water_area,
+    'forest_ha': forest_area
+}).getInfo()
+
+air_data = {
+    'pm25_image': pm25,
+    'affected_area_km2': reductions.get('air_km2') or 0,
+    'city_statistics': city_stats
+}
+
+water_data = {
+    'water_occurrence': water_occurrence,
+    'polluted_water': polluted_water,
+    'affected_area_km2': reductions.get('water_km2') or 0
+}
+
+print(f"✓ Área afectada (PM2.5 > 35): {air_data['affected_area_km2']:.2f} km²")
+print(f"✓ Área de agua contaminada: {water_data['affected_area_km2']:.2f} km²")
 
-total_area_ha = deforested_area.get('lossyear', 0)
+total_area_ha = reductions.get('forest_ha') or 0
 total_co2 = total_area_ha * CARBON_STOCK_BY_FOREST_TYPE['tropical_rainforest'] * CARBON_TO_CO2_FACTOR
 
 soil_data = {
@@ -243,8 +292,11 @@ print("PASO 8: Aplicando modelos económicos...")
 print("="*80)
 
 # Modelo 1: Costos de Salud
-total_exposed_pop = sum([c['population'] for c in city_stats])
-avg_pm25 = sum([c['pm25_mean'] for c in city_stats]) / len(city_stats)
+# Construir el DataFrame una vez y agregar por columnas; se reutiliza
+# después en los gráficos y la exportación a CSV
+results_df = pd.DataFrame(city_stats)
+total_exposed_pop = int(results_df['population'].sum())
+avg_pm25 = float(results_df['pm25_mean'].mean())
 
 level = 'low' if avg_pm25 < 15 else 'medium' if avg_pm25 < 35 else 'high' if avg_pm25 < 75 else 'extreme'
 rr = RELATIVE_RISK_FACTORS['PM2.5'][level]
@@ -291,12 +343,41 @@ print("="*80)
 print(f"💵 COSTOS TOTALES: ${total_costs:,.0f} USD")
 print(f"💰 BENEFICIOS POTENCIALES (anual): ${total_annual:,.0f} USD\n")
 
+# PASO 9.5: EXPORTAR CAPAS COMO COG (OPCIONAL)
+# Exportar las capas una vez como GeoTIFF cloud-optimized permite volver a
+# visualizarlas (Map.add_cog_layer / rioxarray) sin re-ejecutar las
+# reducciones de GEE en cada corrida
+EXPORT_COG_LAYERS = False  # Cambiar a True para lanzar las exportaciones
+
+if EXPORT_COG_LAYERS:
+    cog_layers = {
+        'pm25': pm25,
+        'agua_contaminada': polluted_water,
+        'perdida_bosque': forest_loss
+    }
+    for layer_name, layer_image in cog_layers.items():
+        task = ee.batch.Export.image.toDrive(
+            image=layer_image,
+            description=f'bolivia_{layer_name}_cog',
+            fileFormat='GeoTIFF',
+            formatOptions={'cloudOptimized': True},
+            scale=1000,
+            region=bolivia,
+            maxPixels=1e9
+        )
+        task.start()
+        print(f"  Exportación lanzada: bolivia_{layer_name}_cog")
+
 # PASO 10: MAPA INTERACTIVO
 print("="*80)
 print("PASO 9: Generando mapa interactivo...")
 print("="*80)
 
+import geemap
+
 Map = geemap.Map(center=[-16.5, -64], zoom=6)
+# Con las capas ya exportadas, se pueden servir sin tocar GEE:
+# Map.add_cog_layer('<url drive/gcs>/bolivia_pm25_cog.tif', name='PM2.5 (COG)')
 Map.addLayer(pm25, {'min': 0, 'max': 100, 'palette': ['green', 'yellow', 'orange', 'red', 'darkred']}, 'PM2.5 Concentration')
 Map.addLayer(forest_loss, {'min': 0, 'max': 1, 'palette': ['white', 'red']}, 'Deforestación')
 Map.addLayer(polluted_water, {'min': 0, 'max': 1, 'palette': ['white', 'blue']}, 'Agua Contaminada')
@@ -309,6 +390,9 @@ print("="*80)
 print("PASO 10: Generando gráficos...")
 print("="*80)
 
+import matplotlib.pyplot as plt
+import seaborn as sns
+
 sns.set_style('whitegrid')
 fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
 
@@ -341,7 +425,6 @@ print("="*80)
 print("PASO 11: Exportando resultados...")
 print("="*80)
 
-results_df = pd.DataFrame(city_stats)
 results_df.to_csv('bolivia_pollution_results.csv', index=False)
 
 economic_df = pd.DataFrame({
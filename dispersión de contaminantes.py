@@ -1,3 +1,6 @@
+import math
+import sys
+
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import cm
@@ -8,10 +11,32 @@ from scipy.special import erf
 import warnings
 warnings.filterwarnings('ignore')
 
+# Numba es opcional: si está disponible, la malla de concentraciones se
+# evalúa con un kernel compilado (SIMD + multihilo); si no, se usa NumPy
+try:
+    from numba import njit, prange
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
 # ============================================================================
 # 1. IMPLEMENTACIÓN DEL MODELO GAUSSIANO DE PLUMA
 # ============================================================================
 
+# Tabla de coeficientes Pasquill-Gifford: clase → (a_y, b_y, a_z, b_z)
+# Forma: σ = a * x^b (x en km, σ en km)
+PG_COEFS = {
+    'A': (0.22, 0.88, 0.20, 0.78),   # Extremadamente inestable
+    'B': (0.16, 0.89, 0.12, 0.91),   # Moderadamente inestable
+    'C': (0.11, 0.91, 0.08, 0.92),   # Ligeramente inestable
+    'D': (0.08, 0.92, 0.06, 0.92),   # Neutra
+    'E': (0.06, 0.92, 0.03, 0.92),   # Ligeramente estable
+    'F': (0.04, 0.92, 0.016, 0.89),  # Moderadamente estable
+}
+
+# Caché de σy/σz por (contenido del eje x, clase de estabilidad)
+_pg_cache = {}
+
 def coeficientes_dispersion_pasquill_gifford(x, clase_estabilidad='D'):
     """
     Calcula los coeficientes de dispersión σy y σz según el método
@@ -24,30 +49,20 @@ def coeficientes_dispersion_pasquill_gifford(x, clase_estabilidad='D'):
     D: Neutra (condiciones nubladas/viento moderado)
     E: Ligeramente estable
     F: Moderadamente estable
+
+    Acepta x escalar o arreglo NumPy; devuelve σy, σz con la misma forma.
+    Los resultados para arreglos se memorizan: las visualizaciones
+    reutilizan los mismos ejes x varias veces por ejecución.
     """
-    # Coeficientes para σy (horizontal) en metros
-    # Forma: σy = a * x^b (x en metros)
-    if clase_estabilidad == 'A':  # Extremadamente inestable
-        a_y, b_y = 0.22, 0.88
-        a_z, b_z = 0.20, 0.78
-    elif clase_estabilidad == 'B':  # Moderadamente inestable
-        a_y, b_y = 0.16, 0.89
-        a_z, b_z = 0.12, 0.91
-    elif clase_estabilidad == 'C':  # Ligeramente inestable
-        a_y, b_y = 0.11, 0.91
-        a_z, b_z = 0.08, 0.92
-    elif clase_estabilidad == 'D':  # Neutra
-        a_y, b_y = 0.08, 0.92
-        a_z, b_z = 0.06, 0.92
-    elif clase_estabilidad == 'E':  # Ligeramente estable
-        a_y, b_y = 0.06, 0.92
-        a_z, b_z = 0.03, 0.92
-    elif clase_estabilidad == 'F':  # Moderadamente estable
-        a_y, b_y = 0.04, 0.92
-        a_z, b_z = 0.016, 0.89
-    else:  # Default: clase D
-        a_y, b_y = 0.08, 0.92
-        a_z, b_z = 0.06, 0.92
+    cache_key = None
+    if isinstance(x, np.ndarray):
+        cache_key = (x.tobytes(), clase_estabilidad)
+        cached = _pg_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # Búsqueda O(1) en la tabla de coeficientes (default: clase D)
+    a_y, b_y, a_z, b_z = PG_COEFS.get(clase_estabilidad, PG_COEFS['D'])
 
     σy = a_y * (x/1000)**b_y * 1000  # Convertir de km a m
     σz = a_z * (x/1000)**b_z * 1000  # Convertir de km a m
@@ -56,6 +71,9 @@ def coeficientes_dispersion_pasquill_gifford(x, clase_estabilidad='D'):
     σy = np.maximum(σy, 10.0)
     σz = np.maximum(σz, 5.0)
 
+    if cache_key is not None:
+        _pg_cache[cache_key] = (σy, σz)
+
     return σy, σz
 
 def modelo_gaussiano_pluma(x, y, z, Q, u, H, σy, σz):
@@ -71,10 +89,13 @@ def modelo_gaussiano_pluma(x, y, z, Q, u, H, σy, σz):
     u: Velocidad del viento (m/s)
     H: Altura efectiva de emisión (m)
     σy, σz: Coeficientes de dispersión (m)
+
+    Acepta escalares o arreglos NumPy; los arreglos se combinan por
+    broadcasting, de modo que una malla completa se evalúa en una sola llamada.
     """
-    # Prevenir división por cero
-    if u <= 0 or σy <= 0 or σz <= 0:
-        return 0.0
+    # Prevenir división por cero (σy, σz ya tienen límite inferior positivo)
+    if u <= 0:
+        return np.zeros(np.broadcast(x, y, z, σy, σz).shape)
 
     term1 = Q / (2 * np.pi * σy * σz * u)
     term2 = np.exp(-y**2 / (2 * σy**2))
@@ -82,6 +103,82 @@ def modelo_gaussiano_pluma(x, y, z, Q, u, H, σy, σz):
 
     return term1 * term2 * term3
 
+if _HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _malla_gaussiana_numba(x, y, z, Q, u, H, a_y, b_y, a_z, b_z):
+        """Kernel compilado: pluma gaussiana sobre la malla (y, x) a z fijo."""
+        C = np.empty((y.size, x.size), dtype=np.float32)
+        for i in prange(x.size):
+            σy = a_y * (x[i] / 1000.0) ** b_y * 1000.0
+            σz = a_z * (x[i] / 1000.0) ** b_z * 1000.0
+            if σy < 10.0:
+                σy = 10.0
+            if σz < 5.0:
+                σz = 5.0
+            term1 = Q / (2.0 * np.pi * σy * σz * u)
+            term3 = (np.exp(-(z - H)**2 / (2.0 * σz**2)) +
+                     np.exp(-(z + H)**2 / (2.0 * σz**2)))
+            for j in range(y.size):
+                C[j, i] = term1 * np.exp(-y[j]**2 / (2.0 * σy**2)) * term3
+        return C
+
+if _HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _pluma_3d_numba(x, y, z, Q, u, H, a_y, b_y, a_z, b_z):
+        """Kernel compilado: pluma gaussiana sobre el volumen (x, y, z)."""
+        C = np.empty((x.size, y.size, z.size), dtype=np.float32)
+        for i in prange(x.size):
+            σy = a_y * (x[i] / 1000.0) ** b_y * 1000.0
+            σz = a_z * (x[i] / 1000.0) ** b_z * 1000.0
+            if σy < 10.0:
+                σy = 10.0
+            if σz < 5.0:
+                σz = 5.0
+            term1 = Q / (2.0 * np.pi * σy * σz * u)
+            for j in range(y.size):
+                term2 = term1 * np.exp(-y[j]**2 / (2.0 * σy**2))
+                for k in range(z.size):
+                    C[i, j, k] = term2 * (
+                        np.exp(-(z[k] - H)**2 / (2.0 * σz**2)) +
+                        np.exp(-(z[k] + H)**2 / (2.0 * σz**2)))
+        return C
+
+def calcular_volumen_concentracion(x, y, z, Q, u, H, clase_estabilidad='D'):
+    """
+    Evalúa la pluma gaussiana sobre el volumen 3D definido por los
+    vectores x, y, z. Devuelve una matriz (Nx, Ny, Nz); usa el kernel
+    Numba si está disponible, con broadcasting NumPy como respaldo.
+    """
+    if _HAS_NUMBA:
+        a_y, b_y, a_z, b_z = PG_COEFS.get(clase_estabilidad, PG_COEFS['D'])
+        return _pluma_3d_numba(x, y, z, float(Q), float(u), float(H),
+                               a_y, b_y, a_z, b_z)
+    σy, σz = coeficientes_dispersion_pasquill_gifford(x, clase_estabilidad)
+    return modelo_gaussiano_pluma(
+        x[:, None, None], y[None, :, None], z[None, None, :],
+        Q, u, H, σy[:, None, None], σz[:, None, None]
+    )
+
+def calcular_malla_concentracion(x, y, z, Q, u, H, clase_estabilidad='D'):
+    """
+    Evalúa la pluma gaussiana sobre la malla definida por los vectores
+    x e y, a altura z fija. Usa el kernel Numba si está disponible;
+    de lo contrario recurre a la ruta NumPy vectorizada.
+    """
+    if _HAS_NUMBA:
+        a_y, b_y, a_z, b_z = PG_COEFS.get(clase_estabilidad, PG_COEFS['D'])
+        return _malla_gaussiana_numba(x, y, float(z), float(Q), float(u),
+                                      float(H), a_y, b_y, a_z, b_z)
+    σy, σz = coeficientes_dispersion_pasquill_gifford(x, clase_estabilidad)
+    # z es escalar: el término de normalización y la reflexión vertical son
+    # vectores de longitud Nx; solo la exponencial transversal es 2D
+    dz2_directa = (z - H)**2   # escalares, calculados una sola vez
+    dz2_reflejada = (z + H)**2
+    term1 = Q / (2 * np.pi * σy * σz * u)
+    term_z = (np.exp(-dz2_directa / (2 * σz**2)) +
+              np.exp(-dz2_reflejada / (2 * σz**2)))
+    return (term1 * term_z)[None, :] * np.exp(-y[:, None]**2 / (2 * σy[None, :]**2))
+
 # ============================================================================
 # 2. ESCENARIO DE APLICACIÓN: PLANTA INDUSTRIAL EN EL ALTO, BOLIVIA
 # ============================================================================
@@ -156,180 +253,214 @@ def altura_efectiva_chimenea(H_fisica, v_s, d, T_s, T_a, u):
 
     return min(H_efectiva, H_fisica * 2)  # Límite superior razonable
 
-# ============================================================================
-# 4. VISUALIZACIÓN 2D: MAPA DE CONCENTRACIONES
-# ============================================================================
-
-def visualizar_mapa_concentracion(contaminante='SO2', z_nivel=1.8):
-    """Visualización 2D de la dispersión del contaminante"""
-
-    # Configurar escenario
-    escenario = escenario_planta_alto()
-    Q = escenario['emisiones'][contaminante]['Q']
-    u = escenario['meteorologia']['velocidad_viento_promedio']
-    H_fisica = escenario['emisor']['altura_fisica']
+def compute_H_efectiva(escenario):
+    """
+    Altura efectiva de emisión para un escenario completo.
 
-    # Calcular altura efectiva
+    Se calcula una sola vez por escenario, fuera de cualquier bucle o
+    expresión vectorizada: el resultado es siempre un escalar.
+    """
     H_efectiva = altura_efectiva_chimenea(
-        H_fisica,
+        escenario['emisor']['altura_fisica'],
         escenario['emisor']['velocidad_salida'],
         escenario['emisor']['diametro'],
         escenario['emisor']['temperatura_salida'],
         escenario['meteorologia']['temperatura_ambiente'],
-        u
+        escenario['meteorologia']['velocidad_viento_promedio']
     )
+    # Invariante: escalar; nunca debe difundirse por la malla
+    assert np.ndim(H_efectiva) == 0
+    return H_efectiva
 
-    # Crear malla espacial
-    x = np.linspace(100, 5000, 100)  # Distancia desde la fuente (m)
-    y = np.linspace(-1000, 1000, 80)  # Ancho transversal (m)
-    X, Y = np.meshgrid(x, y)
-
-    # Calcular concentraciones
-    C = np.zeros_like(X)
-
-    for i in range(len(x)):
-        for j in range(len(y)):
-            σy, σz = coeficientes_dispersion_pasquill_gifford(
-                x[i],
-                escenario['meteorologia']['clase_estabilidad']
-            )
-            C[j, i] = modelo_gaussiano_pluma(
-                x[i], Y[j, i], z_nivel, Q, u, H_efectiva, σy, σz
-            )
-
-    # Convertir a μg/m³ para mejor interpretación
-    C_ug = C * 1e6  # g/m³ a μg/m³
-
-    # Crear figura
-    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-    fig.suptitle(f'Dispersión de {contaminante} - {escenario["nombre"]}\n'
-                 f'Q={Q} g/s, u={u} m/s, H_ef={H_efectiva:.1f} m, Estabilidad: {escenario["meteorologia"]["clase_estabilidad"]}',
-                 fontsize=14, fontweight='bold')
+# ============================================================================
+# 4. VISUALIZACIÓN 2D: MAPA DE CONCENTRACIONES
+# ============================================================================
 
-    # ========== Subplot 1: Mapa de concentraciones ==========
-    ax1 = axes[0, 0]
-    contour = ax1.contourf(X, Y, C_ug, levels=50, cmap='YlOrRd', alpha=0.8)
-    ax1.contour(X, Y, C_ug, levels=10, colors='k', alpha=0.3, linewidths=0.5)
+def visualizar_mapa_concentracion(contaminante='SO2', z_nivel=1.8,
+                                  subplots=('map', 'long', 'trans', 'height'),
+                                  escenario=None):
+    """
+    Visualización 2D de la dispersión del contaminante.
 
-    # Marcar la fuente
-    ax1.plot(0, 0, 'r^', markersize=12, label='Fuente', markeredgecolor='k')
+    subplots selecciona qué paneles calcular y dibujar:
+    'map' (mapa de concentración), 'long' (perfil longitudinal),
+    'trans' (perfil transversal), 'height' (efecto de la altura).
+    Los paneles omitidos no se calculan, lo que abarata el uso
+    interactivo cuando solo interesa uno de ellos.
+    """
 
-    # Marcar receptores sensibles
-    for receptor in escenario['receptores_sensibles']:
-        ax1.plot(receptor['x'], receptor['y'], 'bs', markersize=8,
-                markeredgecolor='k', label=receptor['nombre'])
-        ax1.annotate(receptor['nombre'],
-                    xy=(receptor['x'], receptor['y']),
-                    xytext=(receptor['x']+50, receptor['y']+50),
-                    fontsize=9, color='blue')
-
-    # Línea de la pluma central
-    ax1.axhline(y=0, color='k', linestyle='--', alpha=0.5, linewidth=1)
-
-    ax1.set_xlabel('Distancia desde la fuente (m)', fontsize=11)
-    ax1.set_ylabel('Distancia transversal (m)', fontsize=11)
-    ax1.set_title(f'Mapa de Concentración de {contaminante} (μg/m³) a {z_nivel} m de altura',
-                  fontsize=12, fontweight='bold')
-    ax1.legend(loc='upper right', fontsize=9)
-    ax1.grid(True, alpha=0.3)
+    # Configurar escenario (reutilizable entre visualizaciones)
+    if escenario is None:
+        escenario = escenario_planta_alto()
+    Q = escenario['emisiones'][contaminante]['Q']
+    u = escenario['meteorologia']['velocidad_viento_promedio']
 
-    # Barra de color
-    cbar = plt.colorbar(contour, ax=ax1)
-    cbar.set_label(f'Concentración de {contaminante} (μg/m³)', fontsize=11)
+    # Calcular altura efectiva (escalar, una vez por escenario)
+    H_efectiva = compute_H_efectiva(escenario)
+
+    # Crear malla espacial en float32: la concentración no necesita 15
+    # dígitos y la mitad de bytes duplica el rendimiento de NumPy/Numba
+    x = np.linspace(100, 5000, 100, dtype=np.float32)  # Distancia desde la fuente (m)
+    y = np.linspace(-1000, 1000, 80, dtype=np.float32)  # Ancho transversal (m)
+
+    clase = escenario['meteorologia']['clase_estabilidad']
+
+    # σy/σz dependen solo de x: calcularlos una vez aquí y reutilizar los
+    # vectores en los perfiles longitudinal y de alturas
+    σy_x, σz_x = coeficientes_dispersion_pasquill_gifford(x, clase)
+
+    # Calcular la malla completa solo si se pidió el mapa
+    C_ug = None
+    if 'map' in subplots:
+        C = calcular_malla_concentracion(x, y, z_nivel, Q, u, H_efectiva, clase)
+        # Convertir a μg/m³ para mejor interpretación
+        C_ug = C * 1e6  # g/m³ a μg/m³
+
+    # Crear figura con el número justo de paneles
+    n_paneles = len(subplots)
+    ncols = 2 if n_paneles > 1 else 1
+    nrows = (n_paneles + ncols - 1) // ncols
+    fig, axes = plt.subplots(nrows, ncols, figsize=(7 * ncols, 5 * nrows),
+                             squeeze=False)
+    ejes = iter(axes.ravel())
+    fig.suptitle(f'Dispersión de {contaminante} - {escenario["nombre"]}\n'
+                 f'Q={Q} g/s, u={u} m/s, H_ef={H_efectiva:.1f} m, Estabilidad: {clase}',
+                 fontsize=14, fontweight='bold')
+
+    # ========== Subplot 1: Mapa de concentraciones ==========
+    if 'map' in subplots:
+        ax1 = next(ejes)
+        X, Y = np.meshgrid(x, y)
+        # La malla es regular: imshow evita triangular y poligonizar 50 niveles
+        imagen = ax1.imshow(C_ug, extent=[x.min(), x.max(), y.min(), y.max()],
+                            origin='lower', cmap='YlOrRd', alpha=0.8,
+                            aspect='auto', interpolation='bilinear')
+        ax1.contour(X, Y, C_ug, levels=10, colors='k', alpha=0.3, linewidths=0.5)
+
+        # Marcar la fuente
+        ax1.plot(0, 0, 'r^', markersize=12, label='Fuente', markeredgecolor='k')
+
+        # Marcar receptores sensibles: un solo artista scatter para todos
+        # (escala a decenas de receptores sin crear un artista por punto)
+        receptores = escenario['receptores_sensibles']
+        rxs = np.array([r['x'] for r in receptores])
+        rys = np.array([r['y'] for r in receptores])
+        ax1.scatter(rxs, rys, marker='s', s=64, c='b', edgecolor='k',
+                    label='Receptores sensibles', zorder=5)
+        # Solo las etiquetas requieren colocación individual
+        for receptor in receptores:
+            ax1.annotate(receptor['nombre'],
+                        xy=(receptor['x'], receptor['y']),
+                        xytext=(receptor['x']+50, receptor['y']+50),
+                        fontsize=9, color='blue')
+
+        # Línea de la pluma central
+        ax1.axhline(y=0, color='k', linestyle='--', alpha=0.5, linewidth=1)
+
+        ax1.set_xlabel('Distancia desde la fuente (m)', fontsize=11)
+        ax1.set_ylabel('Distancia transversal (m)', fontsize=11)
+        ax1.set_title(f'Mapa de Concentración de {contaminante} (μg/m³) a {z_nivel} m de altura',
+                      fontsize=12, fontweight='bold')
+        ax1.legend(loc='upper right', fontsize=9)
+        ax1.grid(True, alpha=0.3)
+
+        # Barra de color
+        cbar = plt.colorbar(imagen, ax=ax1)
+        cbar.set_label(f'Concentración de {contaminante} (μg/m³)', fontsize=11)
 
     # ========== Subplot 2: Perfil longitudinal ==========
-    ax2 = axes[0, 1]
-    # Concentración en el eje central (y=0)
-    C_eje = np.zeros_like(x)
-    for i in range(len(x)):
-        σy, σz = coeficientes_dispersion_pasquill_gifford(
-            x[i], escenario['meteorologia']['clase_estabilidad']
-        )
-        C_eje[i] = modelo_gaussiano_pluma(
-            x[i], 0, z_nivel, Q, u, H_efectiva, σy, σz
+    if 'long' in subplots:
+        ax2 = next(ejes)
+        # Concentración en el eje central (y=0)
+        C_eje = modelo_gaussiano_pluma(
+            x, 0, z_nivel, Q, u, H_efectiva, σy_x, σz_x
         ) * 1e6  # Convertir a μg/m³
 
-    ax2.plot(x, C_eje, 'b-', linewidth=2.5)
-    ax2.fill_between(x, 0, C_eje, alpha=0.3, color='blue')
-
-    # Límites permisibles (ejemplo: OMS para SO2 - 24h: 20 μg/m³)
-    if contaminante == 'SO2':
-        limite_OMS = 20  # μg/m³ (promedio 24h)
-        ax2.axhline(y=limite_OMS, color='r', linestyle='--', 
-                   label=f'Límite OMS ({limite_OMS} μg/m³)')
-
-    # Marcar receptores en el eje
-    for receptor in escenario['receptores_sensibles']:
-        if abs(receptor['y']) < 50:  # Cerca del eje central
-            idx = np.argmin(np.abs(x - receptor['x']))
-            ax2.plot(receptor['x'], C_eje[idx], 'ro', markersize=8)
-            ax2.annotate(receptor['nombre'],
-                        xy=(receptor['x'], C_eje[idx]),
-                        xytext=(receptor['x']+100, C_eje[idx]*1.1),
-                        fontsize=9, color='red')
-
-    ax2.set_xlabel('Distancia desde la fuente (m)', fontsize=11)
-    ax2.set_ylabel(f'Concentración de {contaminante} (μg/m³)', fontsize=11)
-    ax2.set_title('Perfil Longitudinal en el Eje Central (y=0)',
-                  fontsize=12, fontweight='bold')
-    ax2.legend()
-    ax2.grid(True, alpha=0.3)
+        ax2.plot(x, C_eje, 'b-', linewidth=2.5)
+        ax2.fill_between(x, 0, C_eje, alpha=0.3, color='blue')
+
+        # Límites permisibles (ejemplo: OMS para SO2 - 24h: 20 μg/m³)
+        if contaminante == 'SO2':
+            limite_OMS = 20  # μg/m³ (promedio 24h)
+            ax2.axhline(y=limite_OMS, color='r', linestyle='--',
+                       label=f'Límite OMS ({limite_OMS} μg/m³)')
+
+        # Marcar receptores cercanos al eje central (un solo scatter)
+        rec_eje = [r for r in escenario['receptores_sensibles']
+                   if abs(r['y']) < 50]
+        if rec_eje:
+            rxs_eje = np.array([r['x'] for r in rec_eje])
+            idxs = np.argmin(np.abs(x[None, :] - rxs_eje[:, None]), axis=1)
+            ax2.scatter(rxs_eje, C_eje[idxs], c='r', s=64, zorder=5)
+            for receptor, idx in zip(rec_eje, idxs):
+                ax2.annotate(receptor['nombre'],
+                            xy=(receptor['x'], C_eje[idx]),
+                            xytext=(receptor['x']+100, C_eje[idx]*1.1),
+                            fontsize=9, color='red')
+
+        ax2.set_xlabel('Distancia desde la fuente (m)', fontsize=11)
+        ax2.set_ylabel(f'Concentración de {contaminante} (μg/m³)', fontsize=11)
+        ax2.set_title('Perfil Longitudinal en el Eje Central (y=0)',
+                      fontsize=12, fontweight='bold')
+        ax2.legend()
+        ax2.grid(True, alpha=0.3)
 
     # ========== Subplot 3: Perfil transversal ==========
-    ax3 = axes[1, 0]
-    # Distancia fija: 2000 m
-    x_fijo = 2000
-    σy_fijo, σz_fijo = coeficientes_dispersion_pasquill_gifford(
-        x_fijo, escenario['meteorologia']['clase_estabilidad']
-    )
-
-    C_transversal = np.zeros_like(y)
-    for j in range(len(y)):
-        C_transversal[j] = modelo_gaussiano_pluma(
-            x_fijo, y[j], z_nivel, Q, u, H_efectiva, σy_fijo, σz_fijo
+    if 'trans' in subplots:
+        ax3 = next(ejes)
+        # Distancia fija: 2000 m
+        x_fijo = 2000
+        σy_fijo, σz_fijo = coeficientes_dispersion_pasquill_gifford(x_fijo, clase)
+
+        C_transversal = modelo_gaussiano_pluma(
+            x_fijo, y, z_nivel, Q, u, H_efectiva, σy_fijo, σz_fijo
         ) * 1e6
 
-    ax3.plot(y, C_transversal, 'g-', linewidth=2.5)
-    ax3.fill_between(y, 0, C_transversal, alpha=0.3, color='green')
+        ax3.plot(y, C_transversal, 'g-', linewidth=2.5)
+        ax3.fill_between(y, 0, C_transversal, alpha=0.3, color='green')
 
-    # Mostrar ancho de la pluma (2σy)
-    ancho_pluma = 2 * σy_fijo
-    ax3.axvline(x=-ancho_pluma/2, color='k', linestyle=':', alpha=0.7,
-               label=f'Ancho pluma (2σy = {ancho_pluma:.0f} m)')
-    ax3.axvline(x=ancho_pluma/2, color='k', linestyle=':', alpha=0.7)
+        # Mostrar ancho de la pluma (2σy)
+        ancho_pluma = 2 * σy_fijo
+        ax3.axvline(x=-ancho_pluma/2, color='k', linestyle=':', alpha=0.7,
+                   label=f'Ancho pluma (2σy = {ancho_pluma:.0f} m)')
+        ax3.axvline(x=ancho_pluma/2, color='k', linestyle=':', alpha=0.7)
 
-    ax3.set_xlabel('Distancia transversal (m)', fontsize=11)
-    ax3.set_ylabel(f'Concentración de {contaminante} (μg/m³)', fontsize=11)
-    ax3.set_title(f'Perfil Transversal a x = {x_fijo} m',
-                  fontsize=12, fontweight='bold')
-    ax3.legend()
-    ax3.grid(True, alpha=0.3)
+        ax3.set_xlabel('Distancia transversal (m)', fontsize=11)
+        ax3.set_ylabel(f'Concentración de {contaminante} (μg/m³)', fontsize=11)
+        ax3.set_title(f'Perfil Transversal a x = {x_fijo} m',
+                      fontsize=12, fontweight='bold')
+        ax3.legend()
+        ax3.grid(True, alpha=0.3)
 
     # ========== Subplot 4: Efecto de la altura ==========
-    ax4 = axes[1, 1]
-    # Concentración a diferentes alturas
-    alturas = [0, 10, 20, 50, 100]
-    x_perfil = np.linspace(100, 3000, 50)
-
-    for altura in alturas:
-        C_altura = np.zeros_like(x_perfil)
-        for i in range(len(x_perfil)):
-            σy, σz = coeficientes_dispersion_pasquill_gifford(
-                x_perfil[i], escenario['meteorologia']['clase_estabilidad']
-            )
-            C_altura[i] = modelo_gaussiano_pluma(
-                x_perfil[i], 0, altura, Q, u, H_efectiva, σy, σz
+    if 'height' in subplots:
+        ax4 = next(ejes)
+        # Concentración a diferentes alturas
+        alturas = [0, 10, 20, 50, 100]
+        x_perfil = np.linspace(100, 3000, 50, dtype=np.float32)
+
+        # Los coeficientes no dependen de la altura: una sola evaluación sirve
+        # para las cinco curvas
+        σy_perfil, σz_perfil = coeficientes_dispersion_pasquill_gifford(x_perfil, clase)
+
+        for altura in alturas:
+            C_altura = modelo_gaussiano_pluma(
+                x_perfil, 0, altura, Q, u, H_efectiva, σy_perfil, σz_perfil
             ) * 1e6
 
-        ax4.plot(x_perfil, C_altura, linewidth=2,
-                label=f'z = {altura} m')
+            ax4.plot(x_perfil, C_altura, linewidth=2,
+                    label=f'z = {altura} m')
 
-    ax4.set_xlabel('Distancia desde la fuente (m)', fontsize=11)
-    ax4.set_ylabel(f'Concentración de {contaminante} (μg/m³)', fontsize=11)
-    ax4.set_title('Concentración a Diferentes Alturas (y=0)',
-                  fontsize=12, fontweight='bold')
-    ax4.legend()
-    ax4.grid(True, alpha=0.3)
+        ax4.set_xlabel('Distancia desde la fuente (m)', fontsize=11)
+        ax4.set_ylabel(f'Concentración de {contaminante} (μg/m³)', fontsize=11)
+        ax4.set_title('Concentración a Diferentes Alturas (y=0)',
+                      fontsize=12, fontweight='bold')
+        ax4.legend()
+        ax4.grid(True, alpha=0.3)
+
+    # Ocultar ejes sobrantes cuando el número de paneles es impar
+    for eje_sobrante in ejes:
+        eje_sobrante.set_visible(False)
 
     plt.tight_layout()
     return fig, C_ug, escenario
@@ -341,90 +472,94 @@ def visualizar_mapa_concentracion(contaminante='SO2', z_nivel=1.8):
 def diseñar_red_monitoreo(escenario, C_max, umbral_alerta=50):
     """Diseña una red óptima de monitoreo basada en el modelo"""
 
-    print("=" * 80)
-    print("DISEÑO DE RED DE MONITOREO DE CALIDAD DEL AIRE")
-    print("=" * 80)
-    print(f"Escenario: {escenario['nombre']}")
-    print(f"Ubicación: {escenario['ubicacion']}")
-    print("-" * 80)
-
-    # Ubicaciones recomendadas para monitores
-    ubicaciones_monitores = []
+    # El informe se acumula en una lista y se emite con una sola
+    # escritura al final: un syscall en lugar de uno por print
+    lines = []
+    lines.append("=" * 80)
+    lines.append("DISEÑO DE RED DE MONITOREO DE CALIDAD DEL AIRE")
+    lines.append("=" * 80)
+    lines.append(f"Escenario: {escenario['nombre']}")
+    lines.append(f"Ubicación: {escenario['ubicacion']}")
+    lines.append("-" * 80)
+
+    # Ubicaciones recomendadas en disposición columnar (SoA): una lista
+    # por campo en vez de una lista de diccionarios, que es como las
+    # consume pandas y evita construir un dict por monitor
+    red = {'nombre': [], 'x': [], 'y': [], 'tipo': [],
+           'parametros': [], 'justificacion': []}
+
+    def agregar_monitor(nombre, x, y, tipo, parametros, justificacion):
+        red['nombre'].append(nombre)
+        red['x'].append(x)
+        red['y'].append(y)
+        red['tipo'].append(tipo)
+        # Cadena 'SO2, PM10, ...' en vez de lista: pandas la almacena
+        # como texto plano y el to_string sale igual de legible
+        red['parametros'].append(', '.join(parametros))
+        red['justificacion'].append(justificacion)
 
     # 1. Monitor en dirección del viento predominante
     direccion_viento = escenario['meteorologia']['direccion_viento_predominante']
     distancia_max = 3000  # m
 
-    # Convertir dirección a coordenadas
-    rad = np.radians(90 - direccion_viento)  # 0° = Norte, 90° = Este
-    x_monitor = distancia_max * np.cos(rad)
-    y_monitor = distancia_max * np.sin(rad)
+    # Convertir dirección a coordenadas (escalar: math evita el despacho
+    # de ufuncs de NumPy para un solo valor)
+    rad = math.radians(90 - direccion_viento)  # 0° = Norte, 90° = Este
+    x_monitor = distancia_max * math.cos(rad)
+    y_monitor = distancia_max * math.sin(rad)
 
-    ubicaciones_monitores.append({
-        'nombre': 'Monitor Principal - Dirección viento',
-        'x': x_monitor,
-        'y': y_monitor,
-        'tipo': 'Estación fija',
-        'parametros': ['SO2', 'PM10', 'NOx', 'O3', 'CO'],
-        'justificacion': 'Capta máxima concentración en dirección del viento'
-    })
+    agregar_monitor('Monitor Principal - Dirección viento',
+                    x_monitor, y_monitor, 'Estación fija',
+                    ['SO2', 'PM10', 'NOx', 'O3', 'CO'],
+                    'Capta máxima concentración en dirección del viento')
 
     # 2. Monitores en zonas sensibles
     for receptor in escenario['receptores_sensibles']:
-        ubicaciones_monitores.append({
-            'nombre': f'Monitor - {receptor["nombre"]}',
-            'x': receptor['x'],
-            'y': receptor['y'],
-            'tipo': 'Estación fija',
-            'parametros': ['SO2', 'PM10', 'NOx'],
-            'justificacion': f'Protección de {receptor["nombre"].lower()}'
-        })
+        agregar_monitor(f'Monitor - {receptor["nombre"]}',
+                        receptor['x'], receptor['y'], 'Estación fija',
+                        ['SO2', 'PM10', 'NOx'],
+                        f'Protección de {receptor["nombre"].lower()}')
 
     # 3. Monitor de fondo (contra-viento)
-    ubicaciones_monitores.append({
-        'nombre': 'Monitor de Fondo',
-        'x': -1000,  # Contra-viento
-        'y': 0,
-        'tipo': 'Estación de referencia',
-        'parametros': ['SO2', 'PM10', 'NOx', 'O3', 'CO', 'Meteorología'],
-        'justificacion': 'Mide concentraciones de fondo sin influencia directa'
-    })
-
-    # 4. Monitores móviles para validación
-    for angulo in [45, 135, 225, 315]:
-        rad = np.radians(90 - angulo)
-        x_movil = 1500 * np.cos(rad)
-        y_movil = 1500 * np.sin(rad)
-
-        ubicaciones_monitores.append({
-            'nombre': f'Monitor Móvil - Sector {angulo}°',
-            'x': x_movil,
-            'y': y_movil,
-            'tipo': 'Unidad móvil',
-            'parametros': ['SO2', 'PM10'],
-            'justificacion': f'Validación en sector {angulo}° desde la fuente'
-        })
+    agregar_monitor('Monitor de Fondo', -1000, 0, 'Estación de referencia',
+                    ['SO2', 'PM10', 'NOx', 'O3', 'CO', 'Meteorología'],
+                    'Mide concentraciones de fondo sin influencia directa')
+
+    # 4. Monitores móviles para validación: los cuatro sectores se
+    # calculan de una vez con trigonometría vectorizada
+    angulos = np.array([45, 135, 225, 315])
+    rads = np.radians(90 - angulos)
+    xs_movil = 1500 * np.cos(rads)
+    ys_movil = 1500 * np.sin(rads)
+
+    for angulo, x_movil, y_movil in zip(angulos, xs_movil, ys_movil):
+        agregar_monitor(f'Monitor Móvil - Sector {angulo}°',
+                        x_movil, y_movil, 'Unidad móvil',
+                        ['SO2', 'PM10'],
+                        f'Validación en sector {angulo}° desde la fuente')
 
     # Mostrar recomendaciones
-    print("\nRECOMENDACIONES PARA LA RED DE MONITOREO:")
-    print("-" * 80)
-
-    df_monitoreo = pd.DataFrame(ubicaciones_monitores)
-    print(df_monitoreo[['nombre', 'tipo', 'parametros', 'justificacion']].to_string(index=False))
-
-    print("\nESPECIFICACIONES TÉCNICAS RECOMENDADAS:")
-    print("-" * 80)
-    print("• Frecuencia de muestreo: Cada 1 hora (promedios horarios)")
-    print("• Parámetros mínimos: SO2, PM10, NOx")
-    print("• Métodos de medición:")
-    print("  - SO2: Fluorescencia UV")
-    print("  - PM10: Beta atenuación")
-    print("  - NOx: Quimiluminiscencia")
-    print("• Control de calidad: Calibración diaria, validación de datos")
-    print("• Umbral de alerta: Concentración >", umbral_alerta, "μg/m³ (SO2)")
-    print("• Protocolo de acción: Notificar autoridades si se superan límites")
-
-    return ubicaciones_monitores
+    lines.append("\nRECOMENDACIONES PARA LA RED DE MONITOREO:")
+    lines.append("-" * 80)
+
+    df_monitoreo = pd.DataFrame(red)
+    lines.append(df_monitoreo[['nombre', 'tipo', 'parametros', 'justificacion']].to_string(index=False))
+
+    lines.append("\nESPECIFICACIONES TÉCNICAS RECOMENDADAS:")
+    lines.append("-" * 80)
+    lines.append("• Frecuencia de muestreo: Cada 1 hora (promedios horarios)")
+    lines.append("• Parámetros mínimos: SO2, PM10, NOx")
+    lines.append("• Métodos de medición:")
+    lines.append("  - SO2: Fluorescencia UV")
+    lines.append("  - PM10: Beta atenuación")
+    lines.append("  - NOx: Quimiluminiscencia")
+    lines.append("• Control de calidad: Calibración diaria, validación de datos")
+    lines.append(f"• Umbral de alerta: Concentración > {umbral_alerta} μg/m³ (SO2)")
+    lines.append("• Protocolo de acción: Notificar autoridades si se superan límites")
+
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+    return red
 
 # ============================================================================
 # 6. EVALUACIÓN DE IMPACTO AMBIENTAL
@@ -433,9 +568,10 @@ def diseñar_red_monitoreo(escenario, C_max, umbral_alerta=50):
 def evaluacion_impacto_ambiental(escenario, concentraciones, contaminante='SO2'):
     """Realiza evaluación de impacto ambiental basada en concentraciones"""
 
-    print("\n" + "=" * 80)
-    print("EVALUACIÓN DE IMPACTO AMBIENTAL")
-    print("=" * 80)
+    lines = []
+    lines.append("\n" + "=" * 80)
+    lines.append("EVALUACIÓN DE IMPACTO AMBIENTAL")
+    lines.append("=" * 80)
 
     # Estándares de calidad del aire (μg/m³)
     # Valores basados en normativa boliviana y recomendaciones OMS
@@ -458,75 +594,79 @@ def evaluacion_impacto_ambiental(escenario, concentraciones, contaminante='SO2')
         }
     }
 
-    # Análisis de concentraciones
+    # Análisis de concentraciones: el promedio sobre celdas positivas se
+    # calcula con where= para no materializar la copia del fancy indexing
     C_max = np.max(concentraciones)
-    C_promedio = np.mean(concentraciones[concentraciones > 0])
+    positivas = concentraciones > 0
+    C_promedio = concentraciones.sum(where=positivas) / np.count_nonzero(positivas)
 
     # Determinar nivel de impacto
     if contaminante in estandares:
         limites = estandares[contaminante]
 
-        print(f"\nCONTAMINANTE ANALIZADO: {contaminante}")
-        print("-" * 80)
-        print(f"Concentración máxima modelada: {C_max:.2f} μg/m³")
-        print(f"Concentración promedio modelada: {C_promedio:.2f} μg/m³")
+        lines.append(f"\nCONTAMINANTE ANALIZADO: {contaminante}")
+        lines.append("-" * 80)
+        lines.append(f"Concentración máxima modelada: {C_max:.2f} μg/m³")
+        lines.append(f"Concentración promedio modelada: {C_promedio:.2f} μg/m³")
 
-        print(f"\nCOMPARACIÓN CON ESTÁNDARES:")
-        print("-" * 80)
+        lines.append(f"\nCOMPARACIÓN CON ESTÁNDARES:")
+        lines.append("-" * 80)
         for estandar, valor in limites.items():
             cumplimiento = "CUMPLE" if C_max <= valor else "EXCEDE"
             color = "✓" if C_max <= valor else "✗"
-            print(f"{color} {estandar}: {valor} μg/m³ → {cumplimiento}")
+            lines.append(f"{color} {estandar}: {valor} μg/m³ → {cumplimiento}")
 
         # Evaluación de impacto
-        print(f"\nEVALUACIÓN DE IMPACTO:")
-        print("-" * 80)
-
-        if C_max <= limites.get('OMS_24h', 100):
-            impacto = "BAJO"
-            descripcion = "Concentraciones dentro de límites saludables"
-            recomendaciones = ["Mantenimiento preventivo", "Monitoreo continuo"]
-        elif C_max <= limites.get('Bolivia_24h', 200):
-            impacto = "MODERADO"
-            descripcion = "Concentraciones dentro de límites legales pero cercanas a límites de salud"
-            recomendaciones = ["Optimizar procesos", "Evaluar mejoras tecnológicas", "Reforzar monitoreo"]
-        elif C_max <= limites.get('alerta', 300):
-            impacto = "ALTO"
-            descripcion = "Concentraciones superan límites de salud"
-            recomendaciones = ["Implementar medidas correctivas", "Evaluar reducción de operaciones", "Informar a población"]
-        else:
-            impacto = "MUY ALTO"
-            descripcion = "Concentraciones en niveles de alerta"
-            recomendaciones = ["Reducir operaciones inmediatamente", "Activar protocolo de emergencia", "Evacuación si es necesario"]
-
-        print(f"Nivel de impacto: {impacto}")
-        print(f"Descripción: {descripcion}")
-
-        print(f"\nRECOMENDACIONES:")
-        print("-" * 80)
+        lines.append(f"\nEVALUACIÓN DE IMPACTO:")
+        lines.append("-" * 80)
+
+        # Clasificación por búsqueda binaria sobre los umbrales ordenados
+        # (equivale a la cadena if/elif con <= en cada nivel)
+        umbrales = np.array([limites.get('OMS_24h', 100),
+                             limites.get('Bolivia_24h', 200),
+                             limites.get('alerta', 300)])
+        niveles = [
+            ("BAJO", "Concentraciones dentro de límites saludables",
+             ["Mantenimiento preventivo", "Monitoreo continuo"]),
+            ("MODERADO", "Concentraciones dentro de límites legales pero cercanas a límites de salud",
+             ["Optimizar procesos", "Evaluar mejoras tecnológicas", "Reforzar monitoreo"]),
+            ("ALTO", "Concentraciones superan límites de salud",
+             ["Implementar medidas correctivas", "Evaluar reducción de operaciones", "Informar a población"]),
+            ("MUY ALTO", "Concentraciones en niveles de alerta",
+             ["Reducir operaciones inmediatamente", "Activar protocolo de emergencia", "Evacuación si es necesario"]),
+        ]
+        impacto, descripcion, recomendaciones = niveles[np.searchsorted(umbrales, C_max)]
+
+        lines.append(f"Nivel de impacto: {impacto}")
+        lines.append(f"Descripción: {descripcion}")
+
+        lines.append(f"\nRECOMENDACIONES:")
+        lines.append("-" * 80)
         for i, rec in enumerate(recomendaciones, 1):
-            print(f"{i}. {rec}")
+            lines.append(f"{i}. {rec}")
 
     # Análisis de receptores sensibles
-    print(f"\nANÁLISIS DE RECEPTORES SENSIBLES:")
-    print("-" * 80)
+    lines.append(f"\nANÁLISIS DE RECEPTORES SENSIBLES:")
+    lines.append("-" * 80)
 
     for receptor in escenario['receptores_sensibles']:
         # Estimación simple de concentración en receptor
         # (En un caso real, se usarían las coordenadas exactas del grid)
-        print(f"\n{receptor['nombre']}:")
+        lines.append(f"\n{receptor['nombre']}:")
         if 'Escuela' in receptor['nombre'] or 'Hospital' in receptor['nombre']:
-            print("  ☛ Población vulnerable (niños, enfermos)")
-            print("  ☛ Se recomienda monitoreo especializado")
-            print("  ☛ Considerar filtros de aire en instalaciones")
+            lines.append("  ☛ Población vulnerable (niños, enfermos)")
+            lines.append("  ☛ Se recomienda monitoreo especializado")
+            lines.append("  ☛ Considerar filtros de aire en instalaciones")
         elif 'Residencial' in receptor['nombre']:
-            print("  ☛ Exposición crónica de población general")
-            print("  ☛ Informar a residentes sobre calidad del aire")
+            lines.append("  ☛ Exposición crónica de población general")
+            lines.append("  ☛ Informar a residentes sobre calidad del aire")
         elif 'Agrícola' in receptor['nombre']:
-            print("  ☛ Posible afectación a cultivos")
-            print("  ☛ Monitorear daños en vegetación")
+            lines.append("  ☛ Posible afectación a cultivos")
+            lines.append("  ☛ Monitorear daños en vegetación")
+
+    lines.append("\n" + "=" * 80)
 
-    print("\n" + "=" * 80)
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 # ============================================================================
 # 7. PLANIFICACIÓN URBANA - ZONAS DE PROTECCIÓN
@@ -535,9 +675,10 @@ def evaluacion_impacto_ambiental(escenario, concentraciones, contaminante='SO2')
 def planificacion_urbana_zona_proteccion(escenario):
     """Define zonas de protección para planificación urbana"""
 
-    print("\n" + "=" * 80)
-    print("PLANIFICACIÓN URBANA - ZONIFICACIÓN DE PROTECCIÓN")
-    print("=" * 80)
+    lines = []
+    lines.append("\n" + "=" * 80)
+    lines.append("PLANIFICACIÓN URBANA - ZONIFICACIÓN DE PROTECCIÓN")
+    lines.append("=" * 80)
 
     # Definir zonas de protección basadas en distancia
     zonas = [
@@ -588,22 +729,24 @@ def planificacion_urbana_zona_proteccion(escenario):
         }
     ]
 
-    print("\nPROPUESTA DE ZONIFICACIÓN AMBIENTAL:")
-    print("-" * 80)
+    lines.append("\nPROPUESTA DE ZONIFICACIÓN AMBIENTAL:")
+    lines.append("-" * 80)
 
     for zona in zonas:
-        print(f"\n{zona['nombre']} (Radio: {zona['radio']} m):")
+        lines.append(f"\n{zona['nombre']} (Radio: {zona['radio']} m):")
         for restriccion in zona['restricciones']:
-            print(f"  • {restriccion}")
+            lines.append(f"  • {restriccion}")
 
-    print("\nRECOMENDACIONES DE PLANIFICACIÓN URBANA:")
-    print("-" * 80)
-    print("1. Incorporar zonas de protección en planes reguladores")
-    print("2. Establecer corredores de viento para ventilación natural")
-    print("3. Diseñar áreas verdes como barreras naturales")
-    print("4. Implementar sistemas de transporte sostenible")
-    print("5. Desarrollar planes de contingencia para episodios críticos")
-    print("6. Fomentar tecnologías limpias en nuevas industrias")
+    lines.append("\nRECOMENDACIONES DE PLANIFICACIÓN URBANA:")
+    lines.append("-" * 80)
+    lines.append("1. Incorporar zonas de protección en planes reguladores")
+    lines.append("2. Establecer corredores de viento para ventilación natural")
+    lines.append("3. Diseñar áreas verdes como barreras naturales")
+    lines.append("4. Implementar sistemas de transporte sostenible")
+    lines.append("5. Desarrollar planes de contingencia para episodios críticos")
+    lines.append("6. Fomentar tecnologías limpias en nuevas industrias")
+
+    sys.stdout.write('\n'.join(lines) + '\n')
 
     return zonas
 
@@ -611,58 +754,48 @@ def planificacion_urbana_zona_proteccion(escenario):
 # 8. VISUALIZACIÓN 3D DE LA PLUMA
 # ============================================================================
 
-def visualizacion_3d_pluma(contaminante='SO2'):
+def visualizacion_3d_pluma(contaminante='SO2', escenario=None):
     """Visualización 3D de la dispersión de la pluma"""
 
-    escenario = escenario_planta_alto()
+    if escenario is None:
+        escenario = escenario_planta_alto()
     Q = escenario['emisiones'][contaminante]['Q']
     u = escenario['meteorologia']['velocidad_viento_promedio']
-    H_fisica = escenario['emisor']['altura_fisica']
 
-    # Calcular altura efectiva
-    H_efectiva = altura_efectiva_chimenea(
-        H_fisica,
-        escenario['emisor']['velocidad_salida'],
-        escenario['emisor']['diametro'],
-        escenario['emisor']['temperatura_salida'],
-        escenario['meteorologia']['temperatura_ambiente'],
-        u
-    )
+    # Calcular altura efectiva (escalar, una vez por escenario)
+    H_efectiva = compute_H_efectiva(escenario)
 
-    # Crear malla 3D
-    x = np.linspace(100, 2000, 30)
-    y = np.linspace(-500, 500, 20)
-    z = np.linspace(0, 200, 15)
+    # Crear malla 3D en float32: precisión de sobra para visualizar y
+    # la mitad de memoria/ancho de banda en la malla y el scatter
+    x = np.linspace(100, 2000, 30, dtype=np.float32)
+    y = np.linspace(-500, 500, 20, dtype=np.float32)
+    z = np.linspace(0, 200, 15, dtype=np.float32)
 
     X, Y, Z = np.meshgrid(x, y, z, indexing='ij')
-    C = np.zeros_like(X)
-
-    # Calcular concentraciones en malla 3D
-    for i in range(len(x)):
-        σy, σz = coeficientes_dispersion_pasquill_gifford(
-            x[i], escenario['meteorologia']['clase_estabilidad']
-        )
 
-        for j in range(len(y)):
-            for k in range(len(z)):
-                C[i, j, k] = modelo_gaussiano_pluma(
-                    x[i], y[j], z[k], Q, u, H_efectiva, σy, σz
-                ) * 1e6  # μg/m³
+    # Calcular concentraciones en malla 3D (kernel Numba en paralelo si
+    # está disponible; broadcasting NumPy como respaldo)
+    C = calcular_volumen_concentracion(
+        x, y, z, Q, u, H_efectiva,
+        escenario['meteorologia']['clase_estabilidad']
+    ) * 1e6  # μg/m³
 
     # Crear figura 3D
     fig = plt.figure(figsize=(14, 10))
     ax = fig.add_subplot(111, projection='3d')
 
-    # Visualizar solo puntos con concentración significativa
+    # Visualizar solo puntos con concentración significativa: los índices
+    # planos se calculan una vez y se reutilizan para las cuatro columnas
     umbral_viz = 0.1  # % de concentración máxima
     C_max = np.max(C)
-    mask = C > (C_max * umbral_viz/100)
+    idx = np.flatnonzero(C > (C_max * umbral_viz/100))
 
-    # Gráfico de dispersión 3D
-    scatter = ax.scatter(X[mask], Y[mask], Z[mask],
-                        c=C[mask], cmap='hot',
+    # Gráfico de dispersión 3D (rasterizado: miles de puntos como un solo
+    # bitmap en salidas vectoriales, sin cambio en pantalla)
+    scatter = ax.scatter(X.ravel()[idx], Y.ravel()[idx], Z.ravel()[idx],
+                        c=C.ravel()[idx], cmap='hot',
                         s=10, alpha=0.6,
-                        vmin=0, vmax=C_max)
+                        vmin=0, vmax=C_max, rasterized=True)
 
     # Marcar la fuente
     ax.scatter([0], [0], [H_efectiva], c='red', s=200, marker='^',
@@ -713,7 +846,7 @@ def main():
 
     # 2. Diseñar red de monitoreo
     print("\n2. DISEÑANDO RED DE MONITOREO...")
-    ubicaciones_monitores = diseñar_red_monitoreo(escenario, np.max(concentraciones))
+    red_monitoreo = diseñar_red_monitoreo(escenario, np.max(concentraciones))
 
     # 3. Evaluación de impacto ambiental
     print("\n3. REALIZANDO EVALUACIÓN DE IMPACTO AMBIENTAL...")
@@ -725,15 +858,19 @@ def main():
 
     # 5. Generar visualización 3D
     print("\n5. GENERANDO VISUALIZACIÓN 3D...")
-    fig_3d = visualizacion_3d_pluma(contaminante)
+    fig_3d = visualizacion_3d_pluma(contaminante, escenario=escenario)
 
     print("\n" + "=" * 100)
     print("ANÁLISIS COMPLETADO EXITOSAMENTE")
     print("=" * 100)
 
-    # Guardar resultados
-    fig_2d.savefig(f'dispersión_{contaminante}_bolivia.png', dpi=300, bbox_inches='tight')
-    fig_3d.savefig(f'pluma_3d_{contaminante}_bolivia.png', dpi=300, bbox_inches='tight')
+    # Guardar resultados: las figuras ya aplican tight_layout, así que
+    # omitir bbox_inches='tight' evita un segundo render completo solo
+    # para medir los márgenes
+    fig_2d.savefig(f'dispersión_{contaminante}_bolivia.png', dpi=300,
+                   pil_kwargs={'compress_level': 1})
+    fig_3d.savefig(f'pluma_3d_{contaminante}_bolivia.png', dpi=300,
+                   pil_kwargs={'compress_level': 1})
 
     print("\nResultados guardados en archivos PNG")
     print(f"- dispersión_{contaminante}_bolivia.png")
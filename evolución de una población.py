@@ -5,8 +5,12 @@ import matplotlib.gridspec as gridspec
 import pandas as pd
 
 # Configuración de estilo
-plt.style.use('seaborn-v0_8-darkgrid')
-np.random.seed(42)
+def configure_plotting():
+    """Aplica el estilo global y fija la semilla; se invoca una sola vez
+    justo antes de generar las figuras, para que la parte de cálculo no
+    pague la carga del estilo de matplotlib."""
+    plt.style.use('seaborn-v0_8-darkgrid')
+    np.random.seed(42)
 
 # ============================================================================
 # 1. FUNCIONES PARA LOS MODELOS POBLACIONALES
@@ -21,10 +25,28 @@ def modelo_logistico(P, t, r, K):
     return r * P * (1 - P/K)
 
 def resolver_modelo(modelo, P0, t, args):
-    """Resuelve el modelo diferencial"""
+    """Resuelve el modelo diferencial (para modelos sin solución conocida)"""
     sol = odeint(modelo, P0, t, args=args)
     return sol.flatten()
 
+def poblacion_exponencial_analitica(P0, t, r, t0=None):
+    """Solución exacta del modelo exponencial: P(t) = P0·e^(r(t-t0))"""
+    if t0 is None:
+        t0 = t[0]
+    return P0 * np.exp(r * (t - t0))
+
+def poblacion_logistica_analitica(P0, t, r, K, t0=None):
+    """
+    Solución exacta del modelo logístico:
+    P(t) = K / (1 + ((K-P0)/P0)·e^(-r(t-t0)))
+
+    Evita la integración numérica completa (LSODA) y no acumula
+    deriva numérica en las proyecciones largas.
+    """
+    if t0 is None:
+        t0 = t[0]
+    return K / (1 + ((K - P0) / P0) * np.exp(-r * (t - t0)))
+
 # ============================================================================
 # 2. DATOS Y PARÁMETROS PARA BOLIVIA
 # ============================================================================
@@ -42,6 +64,14 @@ K_bolivia = 20.0       # Capacidad de carga estimada para Bolivia (en millones)
 # Tiempo para proyecciones futuras (1950-2100)
 t_futuro = np.linspace(1950, 2100, 151)
 
+def year_idx(year):
+    """Índice de un año en t_futuro (malla regular de paso 1 desde 1950).
+
+    Aritmética directa en lugar de buscar con np.where, que recorre
+    todo el vector y depende de la igualdad exacta en flotantes.
+    """
+    return int(round(year - 1950))
+
 # ============================================================================
 # 3. SIMULACIONES DE LOS MODELOS
 # ============================================================================
@@ -49,9 +79,9 @@ t_futuro = np.linspace(1950, 2100, 151)
 # Población inicial en 1950
 P0 = poblacion_historica[0]
 
-# Resolver modelos
-poblacion_exp = resolver_modelo(modelo_exponencial, P0, t_futuro, (r_exponencial,))
-poblacion_log = resolver_modelo(modelo_logistico, P0, t_futuro, (r_logistico, K_bolivia))
+# Resolver modelos (solución analítica: ambos tienen forma cerrada)
+poblacion_exp = poblacion_exponencial_analitica(P0, t_futuro, r_exponencial)
+poblacion_log = poblacion_logistica_analitica(P0, t_futuro, r_logistico, K_bolivia)
 
 # ============================================================================
 # 4. APLICACIONES PRÁCTICAS EN BOLIVIA
@@ -69,9 +99,17 @@ def calcular_emisiones_co2(poblacion, emisiones_per_capita=1.8):  # toneladas CO
     """Calcula emisiones de CO2 para evaluación ambiental"""
     return poblacion * emisiones_per_capita
 
+# Las tres métricas son lineales en la población: una sola multiplicación
+# (coeficientes en columna × serie poblacional en fila) produce la matriz
+# 3×151 con las tres series completas de una vez
+COEF_METRICAS = np.array([1 / 4.5,            # viviendas por habitante
+                          100 * 365 / 1e6,    # m³ de agua por millón hab/año
+                          1.8])               # ton CO2 per cápita
+viviendas_necesarias, demanda_agua, emisiones = COEF_METRICAS[:, None] * poblacion_log
+
 # Aplicaciones para el año 2030 y 2050
-idx_2030 = np.where(t_futuro == 2030)[0][0]
-idx_2050 = np.where(t_futuro == 2050)[0][0]
+idx_2030 = year_idx(2030)
+idx_2050 = year_idx(2050)
 
 # Datos para aplicaciones
 aplicaciones = {
@@ -97,6 +135,8 @@ df_aplicaciones = pd.DataFrame(aplicaciones)
 # 5. VISUALIZACIÓN DE RESULTADOS
 # ============================================================================
 
+configure_plotting()
+
 fig = plt.figure(figsize=(16, 12))
 fig.suptitle('Modelos de Evolución Poblacional y sus Aplicaciones en Bolivia', 
              fontsize=18, fontweight='bold', y=0.98)
@@ -155,10 +195,14 @@ ax2.set_xlim([1950, 2100])
 # ============================================================================
 # Gráfico 3: Aplicación - Necesidades de vivienda
 # ============================================================================
+# Los tres paneles de aplicaciones muestran solo 2020-2100: se recorta
+# con una máscara compartida en vez de dibujar 1950-2019 fuera del xlim
+m2020 = t_futuro >= 2020
+t_2020 = t_futuro[m2020]
+
 ax3 = fig.add_subplot(gs[1, 0])
-viviendas_necesarias = calcular_necesidades_vivienda(poblacion_log)
-ax3.plot(t_futuro, viviendas_necesarias, 'green', linewidth=2.5)
-ax3.fill_between(t_futuro, 0, viviendas_necesarias, alpha=0.3, color='green')
+ax3.plot(t_2020, viviendas_necesarias[m2020], 'green', linewidth=2.5)
+ax3.fill_between(t_2020, 0, viviendas_necesarias[m2020], alpha=0.3, color='green')
 ax3.set_xlabel('Año', fontsize=11)
 ax3.set_ylabel('Viviendas necesarias (millones)', fontsize=11)
 ax3.set_title('Planificación Urbana:\nNecesidades de Vivienda', fontsize=13, fontweight='bold')
@@ -167,7 +211,7 @@ ax3.set_xlim([2020, 2100])
 
 # Destacar años específicos
 for year in [2030, 2050, 2070]:
-    idx = np.where(t_futuro == year)[0][0]
+    idx = year_idx(year)
     ax3.plot(year, viviendas_necesarias[idx], 'ro', markersize=8)
     ax3.annotate(f'{viviendas_necesarias[idx]:.1f}M', 
                  xy=(year, viviendas_necesarias[idx]),
@@ -178,9 +222,8 @@ for year in [2030, 2050, 2070]:
 # Gráfico 4: Aplicación - Demanda de agua
 # ============================================================================
 ax4 = fig.add_subplot(gs[1, 1])
-demanda_agua = calcular_demanda_agua(poblacion_log)
-ax4.plot(t_futuro, demanda_agua, 'blue', linewidth=2.5)
-ax4.fill_between(t_futuro, 0, demanda_agua, alpha=0.3, color='blue')
+ax4.plot(t_2020, demanda_agua[m2020], 'blue', linewidth=2.5)
+ax4.fill_between(t_2020, 0, demanda_agua[m2020], alpha=0.3, color='blue')
 ax4.set_xlabel('Año', fontsize=11)
 ax4.set_ylabel('Demanda de agua (millones m³/año)', fontsize=11)
 ax4.set_title('Gestión de Recursos:\nDemanda de Agua', fontsize=13, fontweight='bold')
@@ -197,9 +240,8 @@ ax4.legend(loc='upper left', fontsize=9)
 # Gráfico 5: Aplicación - Emisiones de CO2
 # ============================================================================
 ax5 = fig.add_subplot(gs[1, 2])
-emisiones = calcular_emisiones_co2(poblacion_log)
-ax5.plot(t_futuro, emisiones, 'brown', linewidth=2.5)
-ax5.fill_between(t_futuro, 0, emisiones, alpha=0.3, color='brown')
+ax5.plot(t_2020, emisiones[m2020], 'brown', linewidth=2.5)
+ax5.fill_between(t_2020, 0, emisiones[m2020], alpha=0.3, color='brown')
 ax5.set_xlabel('Año', fontsize=11)
 ax5.set_ylabel('Emisiones de CO₂ (millones ton/año)', fontsize=11)
 ax5.set_title('Evaluación Ambiental:\nEmisiones de CO₂', fontsize=13, fontweight='bold')
@@ -207,7 +249,7 @@ ax5.grid(True, alpha=0.3)
 ax5.set_xlim([2020, 2100])
 
 # Meta de reducción (ejemplo: 50% de las emisiones actuales)
-meta_reduccion = emisiones[np.where(t_futuro == 2020)[0][0]] * 0.5
+meta_reduccion = emisiones[year_idx(2020)] * 0.5
 ax5.axhline(y=meta_reduccion, color='green', linestyle='--', alpha=0.7,
             label='Meta de reducción 50%')
 ax5.legend(loc='upper left', fontsize=9)
@@ -219,18 +261,12 @@ ax6 = fig.add_subplot(gs[2, :])
 ax6.axis('tight')
 ax6.axis('off')
 
-# Crear tabla
-table_data = []
+# Crear tabla: se formatea directamente desde el bloque numérico del
+# DataFrame (iterrows construye una Series por fila y es innecesario aquí)
 headers = ['Año', 'Población (M)', 'Viviendas (M)', 'Agua (M m³/año)', 'CO₂ (M ton/año)']
 
-for i, row in df_aplicaciones.iterrows():
-    table_data.append([
-        int(row['Año']),
-        f"{row['Población Logística (millones)']:.1f}",
-        f"{row['Viviendas necesarias (millones)']:.1f}",
-        f"{row['Demanda de agua (millones m³/año)']:.1f}",
-        f"{row['Emisiones CO2 (millones ton/año)']:.1f}"
-    ])
+table_data = [[int(año)] + [f"{v:.1f}" for v in valores]
+              for año, *valores in df_aplicaciones.to_numpy()]
 
 # Añadir datos actuales (2020) para comparación
 poblacion_2020 = poblacion_historica[-1]
@@ -264,9 +300,11 @@ fig2.suptitle('Análisis de Sensibilidad: Efecto de Parámetros en el Modelo Log
 
 # Escenario 1: Variación de la tasa de crecimiento (r)
 axes[0, 0].set_title('Variación de la tasa de crecimiento (r)')
-for r in [0.015, 0.020, 0.025, 0.030]:
-    poblacion_escenario = resolver_modelo(modelo_logistico, P0, t_futuro, (r, K_bolivia))
-    axes[0, 0].plot(t_futuro, poblacion_escenario, linewidth=2, 
+r_vec = np.array([0.015, 0.020, 0.025, 0.030])
+# Broadcasting: una sola evaluación vectorizada produce la matriz (4, 151)
+curvas_r = poblacion_logistica_analitica(P0, t_futuro, r_vec[:, None], K_bolivia)
+for r, poblacion_escenario in zip(r_vec, curvas_r):
+    axes[0, 0].plot(t_futuro, poblacion_escenario, linewidth=2,
                    label=f'r = {r:.3f}')
 axes[0, 0].set_xlabel('Año')
 axes[0, 0].set_ylabel('Población (millones)')
@@ -275,9 +313,10 @@ axes[0, 0].grid(True, alpha=0.3)
 
 # Escenario 2: Variación de la capacidad de carga (K)
 axes[0, 1].set_title('Variación de la capacidad de carga (K)')
-for K in [15.0, 20.0, 25.0, 30.0]:
-    poblacion_escenario = resolver_modelo(modelo_logistico, P0, t_futuro, (r_logistico, K))
-    axes[0, 1].plot(t_futuro, poblacion_escenario, linewidth=2, 
+K_vec = np.array([15.0, 20.0, 25.0, 30.0])
+curvas_K = poblacion_logistica_analitica(P0, t_futuro, r_logistico, K_vec[:, None])
+for K, poblacion_escenario in zip(K_vec, curvas_K):
+    axes[0, 1].plot(t_futuro, poblacion_escenario, linewidth=2,
                    label=f'K = {K:.1f}M')
 axes[0, 1].set_xlabel('Año')
 axes[0, 1].set_ylabel('Población (millones)')
@@ -286,9 +325,10 @@ axes[0, 1].grid(True, alpha=0.3)
 
 # Escenario 3: Cambio en población inicial
 axes[1, 0].set_title('Variación de población inicial (P₀)')
-for P0_esc in [2.0, 3.0, 4.0, 5.0]:
-    poblacion_escenario = resolver_modelo(modelo_logistico, P0_esc, t_futuro, (r_logistico, K_bolivia))
-    axes[1, 0].plot(t_futuro, poblacion_escenario, linewidth=2, 
+P0_vec = np.array([2.0, 3.0, 4.0, 5.0])
+curvas_P0 = poblacion_logistica_analitica(P0_vec[:, None], t_futuro, r_logistico, K_bolivia)
+for P0_esc, poblacion_escenario in zip(P0_vec, curvas_P0):
+    axes[1, 0].plot(t_futuro, poblacion_escenario, linewidth=2,
                    label=f'P₀ = {P0_esc:.1f}M')
 axes[1, 0].set_xlabel('Año')
 axes[1, 0].set_ylabel('Población (millones)')
@@ -304,9 +344,11 @@ paises = {
     'Paraguay (K=15M)': (0.018, 15.0)
 }
 
-for pais, params in paises.items():
-    r, K = params
-    poblacion_escenario = resolver_modelo(modelo_logistico, 3.0, t_futuro, (r, K))
+r_paises = np.array([p[0] for p in paises.values()])
+K_paises = np.array([p[1] for p in paises.values()])
+curvas_paises = poblacion_logistica_analitica(3.0, t_futuro,
+                                              r_paises[:, None], K_paises[:, None])
+for pais, poblacion_escenario in zip(paises, curvas_paises):
     axes[1, 1].plot(t_futuro, poblacion_escenario, linewidth=2, label=pais)
 
 axes[1, 1].set_xlabel('Año')